@@ -1,16 +1,20 @@
 """Main Discord bot instance."""
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
+import asyncio
 import os
 import sys
 import json
+import time
+import atexit
+import queue
 import logging
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from typing import Literal, Optional
 from pathlib import Path
 
 from config.settings import DISCORD_TOKEN, BOT_PREFIX, BOT_STATUS, DEBUG, OWNER_ID
-from bot.utils.images import cleanup_old_cache_files
+from bot.utils.images import cleanup_old_cache_files, next_cache_expiry
 
 # =====================
 # Jishaku environment
@@ -22,6 +26,17 @@ os.environ['JISHAKU_RETAIN'] = 'True'
 # =====================
 # Logging setup
 # =====================
+class FastTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """TimedRotatingFileHandler that skips the rollover checks until one is due."""
+
+    def shouldRollover(self, record):
+        # Compare the record's timestamp first so the time()/stat calls in the
+        # base implementation only run once the rollover time has passed
+        if record.created < self.rolloverAt:
+            return False
+        return super().shouldRollover(record)
+
+
 def setup_logging():
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
@@ -33,7 +48,7 @@ def setup_logging():
     )
 
     # File handler (daily rotation)
-    file_handler = TimedRotatingFileHandler(
+    file_handler = FastTimedRotatingFileHandler(
         log_file,
         when="midnight",
         interval=1,
@@ -47,10 +62,21 @@ def setup_logging():
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
 
+    # Records are queued by the caller and written by a background thread,
+    # so file writes and rollovers never run on the event loop
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(
+        log_queue,
+        file_handler,
+        console_handler,
+        respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(QueueHandler(log_queue))
 
 
 setup_logging()
@@ -67,22 +93,33 @@ bot = commands.Bot(
     command_prefix=commands.when_mentioned_or(BOT_PREFIX),
     intents=intents,
     help_command=None,
-    owner_id=int(OWNER_ID) if OWNER_ID else None
+    owner_id=OWNER_ID
 )
 
 # =====================
 # Helpers
 # =====================
+# (mtime, version) of the last parsed changelogs.json
+_VERSION_CACHE: Optional[tuple[float, str]] = None
+
+
 def get_latest_version() -> str:
     """Get the latest version from changelogs.json."""
+    global _VERSION_CACHE
     try:
         changelogs_file = Path("changelogs.json")
         if changelogs_file.exists():
+            mtime = changelogs_file.stat().st_mtime
+            if _VERSION_CACHE is not None and _VERSION_CACHE[0] == mtime:
+                return _VERSION_CACHE[1]
+
             with open(changelogs_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                changelogs = data.get('changelogs', [])
-                if changelogs:
-                    return f"v{changelogs[-1].get('version', '1.0.0')}"
+            changelogs = data.get('changelogs', [])
+            if changelogs:
+                version = f"v{changelogs[-1].get('version', '1.0.0')}"
+                _VERSION_CACHE = (mtime, version)
+                return version
     except Exception as e:
         logger.warning("Failed to load version from changelogs: %s", e)
     return "v1.0.0"
@@ -91,6 +128,17 @@ def get_latest_version() -> str:
 # =====================
 # Events
 # =====================
+# on_ready fires again after every reconnect; startup work must only run once
+_startup_done = asyncio.Event()
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _log_task_failure(task: asyncio.Task) -> None:
+    """Log a background task's exception, which would otherwise only surface when it's garbage collected."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task %s failed", task.get_name(), exc_info=task.exception())
+
+
 @bot.event
 async def on_ready():
     logger.info("✅ Bot connected as %s", bot.user)
@@ -101,8 +149,20 @@ async def on_ready():
     )
     await bot.change_presence(activity=custom_status)
 
-    await load_cogs()
-    periodic_cache_cleanup.start()
+    if _startup_done.is_set():
+        return
+    _startup_done.set()
+
+    # Load cogs in the background so on_ready returns as soon as presence is set
+    task = asyncio.create_task(load_cogs(), name="load_cogs")
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(_log_task_failure)
+
+    cleanup_task = asyncio.create_task(periodic_cache_cleanup(), name="periodic_cache_cleanup")
+    _background_tasks.add(cleanup_task)
+    cleanup_task.add_done_callback(_background_tasks.discard)
+    cleanup_task.add_done_callback(_log_task_failure)
 
 
 @bot.event
@@ -113,45 +173,81 @@ async def on_error(event, *args, **kwargs):
 # =====================
 # Tasks
 # =====================
-@tasks.loop(hours=1)
-async def periodic_cache_cleanup():
-    try:
-        deleted = await cleanup_old_cache_files(
-            cache_dir='.cache',
-            max_age_seconds=3600
-        )
-        if deleted > 0:
-            logger.info(
-                "Periodic cache cleanup removed %s old file(s)",
-                deleted
-            )
-    except Exception:
-        logger.exception("Error during periodic cache cleanup")
+CACHE_DIR = '.cache'
+CACHE_MAX_AGE_SECONDS = 3600
+CACHE_CLEANUP_MIN_DELAY = 30
 
 
-@periodic_cache_cleanup.before_loop
-async def before_periodic_cleanup():
+async def periodic_cache_cleanup():
+    """Remove expired cache files, sleeping until the next file is due to expire."""
     await bot.wait_until_ready()
+    last_pass_deleted = True
+    while True:
+        try:
+            next_due = await next_cache_expiry(
+                cache_dir=CACHE_DIR,
+                max_age_seconds=CACHE_MAX_AGE_SECONDS
+            )
+            if next_due is None:
+                # Nothing cached: check back after a full max-age period
+                delay = CACHE_MAX_AGE_SECONDS
+            elif next_due <= time.time() and not last_pass_deleted:
+                # Expired files survived the last pass (e.g. permission errors);
+                # back off instead of rescanning at the minimum delay forever
+                delay = CACHE_MAX_AGE_SECONDS
+            else:
+                delay = next_due - time.time()
+            await asyncio.sleep(max(CACHE_CLEANUP_MIN_DELAY, delay))
+
+            deleted = await cleanup_old_cache_files(
+                cache_dir=CACHE_DIR,
+                max_age_seconds=CACHE_MAX_AGE_SECONDS
+            )
+            last_pass_deleted = deleted > 0
+            if deleted > 0:
+                logger.info(
+                    "Periodic cache cleanup removed %s old file(s)",
+                    deleted
+                )
+        except Exception:
+            logger.exception("Error during periodic cache cleanup")
+            await asyncio.sleep(CACHE_CLEANUP_MIN_DELAY)
 
 
 # =====================
 # Cog loading
 # =====================
+COG_LOAD_TIMEOUT = 30
+
+# Cog modules are scanned once at import; reconnects and reloads reuse this list
+COG_MODULES = tuple(
+    f"bot.cogs.{file.stem}"
+    for file in sorted((Path(__file__).parent / "cogs").iterdir())
+    if file.suffix == ".py" and file.name != "__init__.py"
+)
+
+
 async def load_cogs():
     if DEBUG:
         await bot.load_extension('jishaku')
         logger.info("✅ Loaded extension: jishaku")
 
-    cogs_dir = Path(__file__).parent / "cogs"
-
-    for file in cogs_dir.iterdir():
-        if file.suffix == ".py" and file.name != "__init__.py":
-            cog_name = file.stem
-            try:
-                await bot.load_extension(f"bot.cogs.{cog_name}")
-                logger.info("✅ Loaded cog: %s", cog_name)
-            except Exception:
-                logger.exception("❌ Failed to load cog: %s", cog_name)
+    # Load all cogs concurrently; a timeout keeps one stuck cog from hanging startup
+    results = await asyncio.gather(
+        *(
+            asyncio.wait_for(
+                bot.load_extension(module),
+                timeout=COG_LOAD_TIMEOUT
+            )
+            for module in COG_MODULES
+        ),
+        return_exceptions=True
+    )
+    for module, result in zip(COG_MODULES, results):
+        if isinstance(result, BaseException):
+            logger.error("❌ Failed to load cog: %s", module, exc_info=result)
+        else:
+            logger.info("✅ Loaded cog: %s", module)
 
     try:
         synced = await bot.tree.sync()
@@ -163,6 +259,8 @@ async def load_cogs():
 # =====================
 # Owner commands
 # =====================
+SYNC_CONCURRENCY = 10
+
 @commands.guild_only()
 @bot.command(name="sync")
 @commands.is_owner()
@@ -189,14 +287,21 @@ async def sync(
         )
         return
 
-    success = 0
-    for guild in guilds:
-        try:
-            await ctx.bot.tree.sync(guild=guild)
-        except discord.HTTPException:
-            pass
-        else:
-            success += 1
+    # Sync guilds concurrently, capped to stay within Discord's rate limits
+    semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+
+    async def sync_guild(guild: discord.Object):
+        async with semaphore:
+            return await ctx.bot.tree.sync(guild=guild)
+
+    results = await asyncio.gather(
+        *(sync_guild(guild) for guild in guilds),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, discord.HTTPException):
+            logger.error("Failed to sync guild commands", exc_info=result)
+    success = sum(1 for result in results if not isinstance(result, Exception))
 
     await ctx.send(
         f"Synced commands to {success}/{len(guilds)} guild(s)"
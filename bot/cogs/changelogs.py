@@ -2,6 +2,7 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
 import json
 import logging
 from pathlib import Path
@@ -66,20 +67,35 @@ class Changelogs(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.changelogs_file = Path("changelogs.json")
+        self._cache = None
+        self._cache_mtime = 0
 
-    def load_changelogs(self) -> list:
-        """Load changelogs from changelogs.json, with latest first."""
+    async def load_changelogs(self) -> list:
+        """Load changelogs without blocking the event loop."""
+        return await asyncio.to_thread(self._read_changelogs)
+
+    def _read_changelogs(self) -> list:
+        """Read changelogs from changelogs.json, with latest first.
+
+        The parsed list is cached and only re-read when the file's mtime changes.
+        """
         try:
-            if self.changelogs_file.exists():
-                with open(self.changelogs_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    changelogs = data.get('changelogs', [])
-                    return list(reversed(changelogs))  # Reverse to show latest first
-            else:
-                logger.warning(f"Changelogs file not found: {self.changelogs_file}")
+            try:
+                mtime = self.changelogs_file.stat().st_mtime
+            except FileNotFoundError:
+                logger.warning("Changelogs file not found: %s", self.changelogs_file)
                 return []
-        except Exception as e:
-            logger.exception(f"Failed to load changelogs: {e}")
+
+            if self._cache is not None and mtime == self._cache_mtime:
+                return self._cache
+
+            data = json.loads(self.changelogs_file.read_bytes())
+            changelogs = data.get('changelogs', [])
+            self._cache = list(reversed(changelogs))  # Reverse to show latest first
+            self._cache_mtime = mtime
+            return self._cache
+        except Exception:
+            logger.exception("Failed to load changelogs")
             return []
 
     @app_commands.command(name='changelogs', description='View bot version changelogs')
@@ -88,7 +104,7 @@ class Changelogs(commands.Cog):
         """Display bot changelogs."""
         await interaction.response.defer(ephemeral=True)
 
-        changelogs = self.load_changelogs()
+        changelogs = await self.load_changelogs()
 
         if not changelogs:
             await interaction.followup.send("❌ No changelogs found.", ephemeral=True)
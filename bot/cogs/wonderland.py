@@ -1,26 +1,42 @@
 # --- BLOCK 1: Standard Library (Built-in Python stuff) ---
-import copy
-import json
+import asyncio
+import io
 import logging
+import time
+import types
+from collections import OrderedDict
 from pathlib import Path
+from urllib.parse import urlsplit
 
 # --- BLOCK 2: Third-Party (Pip installed stuff) ---
 import aiohttp
 import discord
+import orjson
 from discord import app_commands
 from discord.ext import commands
 
 # --- BLOCK 3: Local Application (Your own files) ---
 from bot.utils.images import (
-    download_image,
+    attach_file_to_message,
+    fetch_image,
+    image_extension,
     remove_cached_file,
-    upload_file_via_interaction,
 )
 
 MAX_DESC_LENGTH = 1024  # Mobile-friendly summary limit
+ERROR_COLOR = 15158332
+GUID_MAX_LENGTH = 20
+RESPONSE_CACHE_TTL = 60  # Seconds a successful level API response is reused
+RESPONSE_CACHE_MAXSIZE = 512
+PAYLOAD_TEMPLATE_PATH = Path("ref/payload.json")
+EMBED_TEMPLATE_PATH = Path("ref/embed.json")
+JSON_HEADERS = {"Content-Type": "application/json"}
+ATTACHMENT_EXTENSIONS = frozenset({"png", "jpg", "jpeg", "gif", "webp"})
+HOTLINK_HOSTS = ("hoyolab.com", "hoyoverse.com")  # Stable CDNs Discord can load covers from
+SLOW_REQUEST_MS = 500  # DEBUG only: HTTP requests slower than this are logged as warnings
 logger = logging.getLogger(__name__)
 
-from config.settings import REGION_NAMES, ServerRegion
+from config.settings import DEBUG, HOTLINK_COVER_IMAGES, REGION_NAMES, VALID_SERVERS, ServerRegion
 
 def truncate_description(text: str, limit: int = 2048) -> str:
     if not text:
@@ -30,13 +46,229 @@ def truncate_description(text: str, limit: int = 2048) -> str:
     return text[: limit - 3].rstrip() + "..."
 
 
+def error_embed(description: str) -> discord.Embed:
+    return discord.Embed(
+        title="An error occurred", description=description, color=ERROR_COLOR
+    )
+
+
+def url_template(url: str) -> str:
+    """Turn a template URL's level_id/server_region placeholders into str.format fields."""
+    # Escape literal braces first so they survive format_map
+    return (
+        url.replace("{", "{{")
+        .replace("}", "}}")
+        .replace("level_id", "{level_id}")
+        .replace("server_region", "{server_region}")
+    )
+
+
+def can_hotlink(url: str) -> bool:
+    """Whether a cover URL can be used in the embed as-is instead of re-uploading it."""
+    if not HOTLINK_COVER_IMAGES:
+        return False
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == domain or host.endswith(f".{domain}") for domain in HOTLINK_HOSTS)
+
+
+def attachment_name_for(guid: str, server: str, ext: str) -> str:
+    """Deterministic attachment filename for a level's cover image, given its detected extension."""
+    if ext not in ATTACHMENT_EXTENSIONS:
+        ext = "png"
+    return f"{guid}_{server}.{ext}"
+
+
+def timing_trace_config() -> aiohttp.TraceConfig:
+    """Trace hooks that log how long each HTTP request made through the session takes."""
+    async def on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        elapsed_ms = (time.perf_counter() - ctx.start) * 1000
+        if elapsed_ms > SLOW_REQUEST_MS:
+            logger.warning("Slow request %.1fms: %s %s", elapsed_ms, params.method, params.url)
+        else:
+            logger.debug("Request %.1fms: %s %s", elapsed_ms, params.method, params.url)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
 class WonderlandCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        with open("ref/payload.json", "r") as f:
-            self.payload_template = json.load(f)
-        with open("ref/embed.json", "r") as f:
-            self.embed_template = json.load(f)
+        self.payload_template: types.MappingProxyType = types.MappingProxyType({})
+        self.embed_template: types.MappingProxyType = types.MappingProxyType({})
+        self.url = ""
+        self._payload_blob = b""
+        self._link_buttons: tuple[tuple[str, str], ...] = ()
+        self._embed_color = None
+        self._embed_fields: tuple[tuple[str, str, bool], ...] = ()
+        self.session: aiohttp.ClientSession | None = None
+        self._background_tasks: set[asyncio.Task] = set()
+        # (guid, server) -> (expiry time, decoded API response), least recently used first
+        self._response_cache: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+
+    async def cog_load(self):
+        # Read the templates in a worker thread so cog loading doesn't block the gateway.
+        # They are shared by every request; the proxies only make the top level read-only
+        # (nested dicts and lists are not), so requests work from the blob and tuples below.
+        payload_raw, embed_raw = await asyncio.to_thread(
+            lambda: (PAYLOAD_TEMPLATE_PATH.read_bytes(), EMBED_TEMPLATE_PATH.read_bytes())
+        )
+        self.payload_template = types.MappingProxyType(orjson.loads(payload_raw))
+        self.embed_template = types.MappingProxyType(orjson.loads(embed_raw))
+
+        # Serialized payload template: orjson.loads on it gives a fresh mutable copy much faster than deepcopy
+        self.url = self.payload_template["url"]
+        self._payload_blob = orjson.dumps(self.payload_template["payload"])
+
+        # The embed layout is fixed; keep just what's needed to build it directly,
+        # instead of running discord.Embed.from_dict on a patched dict per request
+        embed_spec = self.embed_template["embeds"][0]
+        self._embed_color = embed_spec.get("color")
+        self._embed_fields = tuple(
+            (field["name"], field["value"], field.get("inline", False))
+            for field in embed_spec.get("fields", [])
+        )
+
+        # (label, url template) for each link button, placeholders rewritten once into format_map fields
+        self._link_buttons = tuple(
+            (
+                component.get("label"),
+                url_template(component["url"]),
+            )
+            for row in self.embed_template["components"]
+            for component in row["components"]
+            if component.get("type") == 2 and component.get("style") == 5  # Button with link
+        )
+
+        # One session for the cog's lifetime so connections, TLS and DNS lookups are reused
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100, limit_per_host=20, ttl_dns_cache=600, keepalive_timeout=75
+            ),
+            timeout=aiohttp.ClientTimeout(total=15),
+            trace_configs=[timing_trace_config()] if DEBUG else None,
+        )
+
+    async def cog_unload(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def _reply(
+        self, interaction: discord.Interaction, use_channel: bool, **kwargs
+    ):
+        """
+        Send a followup, or a plain channel message when the interaction could not be deferred.
+
+        Returns the sent message, or None if there was nowhere to send it.
+        """
+        if not use_channel:
+            return await interaction.followup.send(wait=True, **kwargs)
+
+        channel = getattr(interaction, "channel", None)
+        if channel is None or not hasattr(channel, "send"):
+            logger.warning("No fallback channel available to send the message")
+            return None
+        kwargs.pop("ephemeral", None)  # Channel messages can't be ephemeral
+        return await channel.send(**kwargs)
+
+    async def _fetch_level(self, guid: str, server: str) -> tuple[dict | None, str | None]:
+        """POST the level query; returns (decoded response, None) or (None, error message)."""
+        payload = orjson.loads(self._payload_blob)
+        payload["level_id"] = guid
+        payload["region"] = server
+
+        # Send orjson's bytes as-is; aiohttp's json= would need them decoded to str and re-encoded
+        async with self.session.post(
+            self.url, data=orjson.dumps(payload), headers=JSON_HEADERS
+        ) as response:
+            if response.status != 200:
+                return None, "The server returned an error."
+
+            try:
+                return orjson.loads(await response.read()), None
+            except orjson.JSONDecodeError:
+                return None, "Could not decode the response from the server."
+
+    def _get_cached_response(self, key: tuple[str, str]) -> dict | None:
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at <= time.monotonic():
+            del self._response_cache[key]
+            return None
+        self._response_cache.move_to_end(key)
+        return data
+
+    def _cache_response(self, key: tuple[str, str], data: dict) -> None:
+        self._response_cache.pop(key, None)
+        if len(self._response_cache) >= RESPONSE_CACHE_MAXSIZE:
+            self._response_cache.popitem(last=False)
+        self._response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL, data)
+
+    def _build_embed(self, level_info: dict, server: str) -> discord.Embed:
+        """Assemble the level embed from the precomputed template spec."""
+        # Template field values name the placeholder they are filled with
+        field_values = {
+            "level_id": level_info.get("level_id", "N/A"),
+            "server_region": REGION_NAMES.get(server, "N/A"),
+        }
+        embed = discord.Embed(
+            title=level_info.get("level_name", "N/A"),
+            description=truncate_description(level_info.get("desc", ""), MAX_DESC_LENGTH),
+            color=self._embed_color,
+        )
+        for name, value, inline in self._embed_fields:
+            embed.add_field(
+                name=name, value=field_values.get(value, value), inline=inline
+            )
+        embed.set_image(url=level_info.get("cover_img", {}).get("url"))
+        return embed
+
+    def _build_view(self, guid: str, server: str) -> discord.ui.View:
+        """Build the link buttons from the precomputed (label, url template) specs."""
+        url_values = {"level_id": guid, "server_region": server}
+        view = discord.ui.View()
+        for label, template in self._link_buttons:
+            view.add_item(
+                discord.ui.Button(
+                    label=label,
+                    url=template.format_map(url_values),
+                    style=discord.ButtonStyle.link,
+                )
+            )
+        return view
+
+    async def _download_cover(
+        self, cover_url: str, guid: str, server: str
+    ) -> tuple[io.BytesIO | Path, Path | None]:
+        """
+        Download a cover image, in memory unless it's too large.
+
+        Returns (source to upload, cache file to clean up or None).
+        """
+        source = await fetch_image(
+            cover_url, self.session, guid=guid, server=server, cache_dir=".cache"
+        )
+        return source, source if isinstance(source, Path) else None
+
+    async def _cleanup_cached_file(self, file_path: Path) -> None:
+        try:
+            if await remove_cached_file(file_path):
+                logger.info("Cleaned up cached file: %s", file_path)
+        except Exception:
+            logger.exception("Failed to remove cached file")
+
+    def _schedule_cleanup(self, file_path: Path) -> None:
+        """Remove a cached file in the background so the command can return right away."""
+        task = asyncio.create_task(self._cleanup_cached_file(file_path))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
     @app_commands.command(
         name="wonderland", description="Fetch information about a Wonderland level."
@@ -54,79 +286,68 @@ class WonderlandCog(commands.Cog):
     async def wonderland(
         self, interaction: discord.Interaction, guid: str, server: str
     ):
-        # Validate GUID: only numeric GUIDs are accepted
-        if not guid.isdigit():
-            error_embed = discord.Embed(
-                title="An error occurred", description="Invalid GUID", color=15158332
+        # Validate GUID: only short, ASCII-numeric GUIDs are accepted
+        # (str.isdigit alone also accepts non-ASCII digits such as "٣")
+        if not (
+            0 < len(guid) <= GUID_MAX_LENGTH and guid.isascii() and guid.isdigit()
+        ):
+            await interaction.response.send_message(
+                embed=error_embed("Invalid GUID"), ephemeral=True
             )
-            await interaction.response.send_message(embed=error_embed, ephemeral=True)
             return
 
+        # Don't rely on the command choices alone; reject unknown servers before any I/O
+        if server not in VALID_SERVERS:
+            await interaction.response.send_message(
+                embed=error_embed("Invalid server"), ephemeral=True
+            )
+            return
+
+        # Successful responses are reused for a short while, skipping the API round-trip.
+        # Otherwise start the request now so it overlaps with deferring the interaction.
+        cache_key = (guid, server)
+        data = self._get_cached_response(cache_key)
+        fetched = data is None
+        fetch_task = (
+            asyncio.create_task(self._fetch_level(guid, server)) if fetched else None
+        )
+
         use_channel_fallback = False
         try:
-            await interaction.response.defer(thinking=True)
-        except Exception as e:
-            # If the interaction is no longer valid (Unknown interaction), fallback to channel sends.
-            # This can happen if the interaction token expired or was invalidated.
-            use_channel_fallback = True
-            logger.exception(
-                "Could not defer interaction; falling back to channel sends"
-            )
+            try:
+                await interaction.response.defer(thinking=True)
+            except Exception:
+                # If the interaction is no longer valid (Unknown interaction), fallback to channel sends.
+                # This can happen if the interaction token expired or was invalidated.
+                use_channel_fallback = True
+                logger.exception(
+                    "Could not defer interaction; falling back to channel sends"
+                )
 
-        payload = copy.deepcopy(self.payload_template["payload"])
-        payload["level_id"] = guid
-        payload["region"] = server
+            if fetch_task is not None:
+                data, error = await fetch_task
+        except BaseException:
+            # Don't leave the request running unobserved if the command is cancelled
+            if fetch_task is not None:
+                fetch_task.cancel()
+            raise
 
-        url = self.payload_template["url"]
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                if response.status != 200:
-                    error_embed = discord.Embed(
-                        title="An error occurred",
-                        description="The server returned an error.",
-                        color=15158332,
-                    )
-                    if use_channel_fallback:
-                        channel = getattr(interaction, "channel", None)
-                        if channel and hasattr(channel, "send"):
-                            await channel.send(embed=error_embed)
-                    else:
-                        await interaction.followup.send(
-                            embed=error_embed, ephemeral=True
-                        )
-                    return
-
-                try:
-                    data = await response.json()
-                except json.JSONDecodeError:
-                    error_embed = discord.Embed(
-                        title="An error occurred",
-                        description="Could not decode the response from the server.",
-                        color=15158332,
-                    )
-                    if use_channel_fallback:
-                        channel = getattr(interaction, "channel", None)
-                        if channel and hasattr(channel, "send"):
-                            await channel.send(embed=error_embed)
-                    else:
-                        await interaction.followup.send(
-                            embed=error_embed, ephemeral=True
-                        )
-                    return
+        if fetch_task is not None and data is None:
+            await self._reply(
+                interaction,
+                use_channel_fallback,
+                embed=error_embed(error),
+                ephemeral=True,
+            )
+            return
 
         if data.get("retcode") != 0:
-            error_embed = discord.Embed(
-                title="An error occurred",
-                description=data.get("message", "Unknown error"),
-                color=15158332,
+            await self._reply(
+                interaction,
+                use_channel_fallback,
+                embed=error_embed(data.get("message", "Unknown error")),
+                ephemeral=True,
             )
-            if use_channel_fallback:
-                channel = getattr(interaction, "channel", None)
-                if channel and hasattr(channel, "send"):
-                    await channel.send(embed=error_embed)
-                else:
-                    await interaction.followup.send(embed=error_embed, ephemeral=True)
             return
 
         # Guard against nested API errors where level_detail.data can be null
@@ -145,140 +366,86 @@ class WonderlandCog(commands.Cog):
             if isinstance(level_detail, dict):
                 nested_msg = level_detail.get("message")
 
-            error_embed = discord.Embed(
-                title="An error occurred",
-                description=nested_msg or data.get("message", "Level not found"),
-                color=15158332,
+            await self._reply(
+                interaction,
+                use_channel_fallback,
+                embed=error_embed(nested_msg or data.get("message", "Level not found")),
+                ephemeral=True,
             )
-            if use_channel_fallback:
-                channel = getattr(interaction, "channel", None)
-                if channel and hasattr(channel, "send"):
-                    await channel.send(embed=error_embed)
-                else:
-                    await interaction.followup.send(embed=error_embed, ephemeral=True)
             return
 
         try:
             level_info = level_detail["data"]["level_detail_response"]["level_info"]
         except (KeyError, TypeError):
-            error_embed = discord.Embed(
-                title="An error occurred",
-                description="Could not find level information in the response.",
-                color=15158332,
+            await self._reply(
+                interaction,
+                use_channel_fallback,
+                embed=error_embed("Could not find level information in the response."),
+                ephemeral=True,
             )
-            if use_channel_fallback:
-                channel = getattr(interaction, "channel", None)
-                if channel and hasattr(channel, "send"):
-                    await channel.send(embed=error_embed)
-                else:
-                    await interaction.followup.send(embed=error_embed, ephemeral=True)
             return
 
-        embed_data = copy.deepcopy(self.embed_template)
-
-        # Populate embed
-        raw_desc = level_info.get("desc", "")
-        embed = embed_data["embeds"][0]
-        embed["title"] = level_info.get("level_name", "N/A")
-        embed["description"] = truncate_description(raw_desc, MAX_DESC_LENGTH)
-        embed["image"]["url"] = level_info.get("cover_img", {}).get("url")
-        for field in embed["fields"]:
-            if field["value"] == "level_id":
-                field["value"] = level_info.get("level_id", "N/A")
-            elif field["value"] == "server_region":
-                field["value"] = REGION_NAMES.get(server, "N/A")
-
-        # Populate components
-        components = embed_data["components"]
-        for row in components:
-            for component in row["components"]:
-                if "url" in component:
-                    component["url"] = (
-                        component["url"]
-                        .replace("level_id", guid)
-                        .replace("server_region", server)
-                    )
-
-        final_embed = discord.Embed.from_dict(embed)
+        if fetched:
+            self._cache_response(cache_key, data)
 
-        view = discord.ui.View()
-        for row in components:
-            for component_data in row["components"]:
-                if (
-                    component_data["type"] == 2 and component_data["style"] == 5
-                ):  # Button with link
-                    view.add_item(
-                        discord.ui.Button(
-                            label=component_data.get("label"),
-                            url=component_data.get("url"),
-                            style=discord.ButtonStyle.link,
-                        )
-                    )
-
-        # Handle cover image: download and send as file attachment
+        final_embed = self._build_embed(level_info, server)
+
+        view = self._build_view(guid, server)
+
+        # Handle cover image: download and send as file attachment.
+        # Images are kept in memory; only oversized ones go through the disk cache.
         cover_url = level_info.get("cover_img", {}).get("url")
+        if cover_url and can_hotlink(cover_url):
+            # The embed already points at the upstream URL; skip the download and upload
+            await self._reply(
+                interaction, use_channel_fallback, embed=final_embed, view=view
+            )
+            return
+
         if cover_url:
-            file_path = None
+            # Send the details right away and download the cover meanwhile;
+            # the message is edited to add the image once it's ready
+            download_task = asyncio.create_task(
+                self._download_cover(cover_url, guid, server)
+            )
+            final_embed.set_image(url=None)
             try:
-                file_path = await download_image(
-                    cover_url, guid=guid, server=server, cache_dir=".cache"
+                message = await self._reply(
+                    interaction, use_channel_fallback, embed=final_embed, view=view
                 )
-                logger.info(f"Downloaded cover image for {guid} on {server}")
+            except BaseException:
+                download_task.cancel()
+                raise
+            if message is None:
+                download_task.cancel()
+                return
+
+            try:
+                source, file_path = await download_task
+                logger.info("Downloaded cover image for %s on %s", guid, server)
             except Exception:
+                # The message already went out without an image; leave it as is
                 logger.exception("Failed to download cover image")
-                # Send embed without image
-                if use_channel_fallback:
-                    channel = getattr(interaction, "channel", None)
-                    if channel and hasattr(channel, "send"):
-                        await channel.send(embed=final_embed, view=view)
-                else:
-                    await interaction.followup.send(embed=final_embed, view=view)
                 return
 
-            # Set embed image to attachment reference
-            attachment_name = Path(file_path).name
-            final_embed.set_image(url=f"attachment://{attachment_name}")
-
             try:
-                # Send the file as attachment
-                success = await upload_file_via_interaction(
-                    interaction,
-                    file_path,
-                    filename=attachment_name,
-                    view=view,
-                    embed=final_embed,
-                    use_channel=use_channel_fallback,
+                # Named after the level, with the extension taken from the downloaded image
+                attachment_name = attachment_name_for(guid, server, image_extension(source))
+                # Set embed image to attachment reference and upload the file with it
+                final_embed.set_image(url=f"attachment://{attachment_name}")
+                uploaded_url = await attach_file_to_message(
+                    message, source, filename=attachment_name, embed=final_embed
                 )
-                if not success:
-                    # Fallback: send without attachment
-                    final_embed.set_image(url=None)
-                    if use_channel_fallback:
-                        channel = getattr(interaction, "channel", None)
-                        if channel and hasattr(channel, "send"):
-                            await channel.send(embed=final_embed, view=view)
-                    else:
-                        await interaction.followup.send(embed=final_embed, view=view)
+                if uploaded_url:
+                    logger.debug("Cover image for %s on %s uploaded to %s", guid, server, uploaded_url)
             finally:
                 # Always clean up local cached file
-                try:
-                    if file_path:
-                        remove_cached_file(file_path)
-                        logger.info(f"Cleaned up cached file: {file_path}")
-                except Exception:
-                    logger.exception("Failed to remove cached file")
+                if file_path:
+                    self._schedule_cleanup(file_path)
             return
 
         # No cover URL: just send embed
-        if use_channel_fallback:
-            channel = getattr(interaction, "channel", None)
-            if channel:
-                send_func = getattr(channel, "send", None)
-                if send_func:
-                    await send_func(embed=final_embed, view=view)
-            else:
-                logger.warning("No fallback channel available to send the embed")
-        else:
-            await interaction.followup.send(embed=final_embed, view=view)
+        await self._reply(interaction, use_channel_fallback, embed=final_embed, view=view)
 
 
 async def setup(bot: commands.Bot):
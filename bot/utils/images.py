@@ -2,16 +2,20 @@
 
 Functions:
 - ensure_cache_dir(cache_dir)
-- download_image(url, guid=None, server=None, cache_dir='.cache') -> Path
-- remove_cached_file(path)
-
-These are async helpers intended to be used from cogs (which are async).
+- fetch_image(url, session, max_bytes=IN_MEMORY_MAX_BYTES, guid=None, server=None, cache_dir=None) -> BytesIO | Path
+- remove_cached_file(path) -> bool
+- cleanup_old_cache_files(cache_dir, max_age_seconds) -> int
+- next_cache_expiry(cache_dir, max_age_seconds) -> float | None
+- image_extension(source) -> str
+- attach_file_to_message(message, source, filename=None, embed=None) -> str | None
+
+Apart from ensure_cache_dir and image_extension, these are async helpers intended to be used from cogs (which are async).
 """
 from __future__ import annotations
 
 import aiohttp
 import asyncio
-import imghdr
+import io
 import os
 import time
 import uuid
@@ -23,21 +27,37 @@ import logging
 logger = logging.getLogger(__name__)
 
 CACHE_DIR_DEFAULT = Path(".cache")
+IN_MEMORY_MAX_BYTES = 8 * 1024 * 1024  # Larger images go through the disk cache
+CHUNK_SIZE = 64 * 1024
+
+# (magic prefix, extension) for the image formats we expect from the level API
+_MAGIC = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+_BMP_DIB_HEADER_SIZES = (12, 40, 56, 108, 124)
 
 
 def ensure_cache_dir(cache_dir: Optional[Path | str] = None) -> Path:
     """Ensure cache directory exists and return the Path."""
     cache_path = Path(cache_dir) if cache_dir else CACHE_DIR_DEFAULT
-    cache_path.mkdir(parents=True, exist_ok=True)
+    os.makedirs(cache_path, exist_ok=True)
     return cache_path
 
 
 def _guess_extension_from_content(content: bytes, content_type: Optional[str] = None) -> str:
     """Return a file extension (without dot) based on content bytes or content-type header."""
-    # First try imghdr
-    kind = imghdr.what(None, h=content)
-    if kind:
-        return kind if kind != 'jpeg' else 'jpg'
+    # First try the file signature
+    for signature, ext in _MAGIC:
+        if content.startswith(signature):
+            return ext
+    if content.startswith(b'RIFF') and content[8:12] == b'WEBP':
+        return 'webp'
+    # "BM" alone matches plenty of text bodies; also require a known DIB header size
+    if content.startswith(b'BM') and int.from_bytes(content[14:18], 'little') in _BMP_DIB_HEADER_SIZES:
+        return 'bmp'
 
     # Fallback to content-type header
     if content_type:
@@ -54,73 +74,122 @@ def _guess_extension_from_content(content: bytes, content_type: Optional[str] =
     return 'bin'
 
 
+def image_extension(source: io.BytesIO | Path) -> str:
+    """Return the extension (without dot) of an image returned by fetch_image."""
+    if isinstance(source, Path):
+        # Cached files are already named from their content and Content-Type
+        return source.suffix.lstrip('.')
+    with source.getbuffer() as view:
+        head = bytes(view[:32])
+    return _guess_extension_from_content(head)
+
+
 def _make_filename(guid: Optional[str], server: Optional[str], ext: str) -> str:
     """Create a unique filename for cached image."""
-    timestamp = int(time.time())
+    # A random suffix keeps concurrent downloads of the same level from sharing a file
+    suffix = uuid.uuid4().hex[:8]
     if guid and server:
-        base = f"{guid}_{server}_{timestamp}"
+        base = f"{guid}_{server}_{suffix}"
     elif guid:
-        base = f"{guid}_{timestamp}"
+        base = f"{guid}_{suffix}"
     else:
-        base = f"{uuid.uuid4().hex}_{timestamp}"
+        base = uuid.uuid4().hex
     return f"{base}.{ext}"
 
 
-async def download_image(url: str, guid: Optional[str] = None, server: Optional[str] = None,
-                         cache_dir: Optional[Path | str] = None, timeout: int = 15) -> Path:
+async def _stream_to_cache(resp: aiohttp.ClientResponse, head: bytes, guid: Optional[str],
+                           server: Optional[str], cache_path: Path) -> Path:
+    """Write `head` (bytes already read from `resp`) and the rest of the response body to a cache file."""
+    # Read just enough to detect the file type, then stream the rest to disk
+    while len(head) < 32:
+        part = await resp.content.read(32 - len(head))
+        if not part:
+            break
+        head += part
+    if not head:
+        raise ValueError("Downloaded content is empty")
+
+    content_type = resp.headers.get('Content-Type')
+    ext = _guess_extension_from_content(head, content_type)
+
+    filename = _make_filename(guid, server, ext)
+    file_path = cache_path / filename
+
+    # Write to disk; file operations run in a worker thread so they don't block the event loop
+    try:
+        f = await asyncio.to_thread(open, file_path, 'wb')
+        try:
+            await asyncio.to_thread(f.write, head)
+            async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+    except BaseException:
+        # Don't leave a truncated image behind
+        await remove_cached_file(file_path)
+        raise
+
+    return file_path
+
+
+async def fetch_image(url: str, session: aiohttp.ClientSession,
+                      max_bytes: int = IN_MEMORY_MAX_BYTES, guid: Optional[str] = None,
+                      server: Optional[str] = None,
+                      cache_dir: Optional[Path | str] = None) -> io.BytesIO | Path:
     """
-    Download an image to the cache directory and return the saved Path.
+    Download an image into memory, spilling it to the cache directory if it's too large.
 
     Args:
         url: Remote image URL
-        guid: Optional GUID to include in filename
-        server: Optional server string to include in filename
-        cache_dir: Local cache directory (defaults to `.cache`)
-        timeout: Request timeout in seconds
+        session: Session to download with
+        max_bytes: Largest image to keep in memory
+        guid: Optional GUID to include in the cache filename
+        server: Optional server string to include in the cache filename
+        cache_dir: Local cache directory for large images (defaults to `.cache`)
 
     Returns:
-        Path to saved file
+        The buffer rewound to the start, or the Path of the cached file if the
+        image is larger than max_bytes (the caller is responsible for removing it)
 
     Raises:
-        aiohttp.ClientError on HTTP issues or ValueError if content is not downloadable
+        aiohttp.ClientError on HTTP issues or ValueError if content is empty
     """
-    cache_path = ensure_cache_dir(cache_dir)
-
-    # Use a short-lived ClientSession for this download
-    client_timeout = aiohttp.ClientTimeout(total=timeout)
-    async with aiohttp.ClientSession(timeout=client_timeout) as session:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                raise aiohttp.ClientResponseError(
-                    status=resp.status, message=f"Failed to download image: {resp.status}", request_info=resp.request_info, history=resp.history
+    async with session.get(url) as resp:
+        if resp.status != 200:
+            raise aiohttp.ClientResponseError(
+                status=resp.status, message=f"Failed to download image: {resp.status}", request_info=resp.request_info, history=resp.history
+            )
+
+        if resp.content_length is not None and resp.content_length > max_bytes:
+            return await _stream_to_cache(resp, b'', guid, server, ensure_cache_dir(cache_dir))
+
+        buffer = io.BytesIO()
+        async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+            buffer.write(chunk)
+            if buffer.tell() > max_bytes:
+                # No (or a wrong) Content-Length: keep what was read and stream the rest of this response to disk
+                return await _stream_to_cache(
+                    resp, buffer.getvalue(), guid, server, ensure_cache_dir(cache_dir)
                 )
 
-            content = await resp.read()
-            if not content:
-                raise ValueError("Downloaded content is empty")
-
-            content_type = resp.headers.get('Content-Type')
-            ext = _guess_extension_from_content(content, content_type)
+        if not buffer.tell():
+            raise ValueError("Downloaded content is empty")
 
-            filename = _make_filename(guid, server, ext)
-            file_path = cache_path / filename
+        buffer.seek(0)
+        return buffer
 
-            # Write to disk
-            with open(file_path, 'wb') as f:
-                f.write(content)
 
-            return file_path
+async def remove_cached_file(path: Path | str) -> bool:
+    """Remove a cached file by path. Returns True if removed, False if not found."""
+    return await asyncio.to_thread(_remove_file, path)
 
 
-def remove_cached_file(path: Path | str) -> bool:
-    """Remove a cached file by path. Returns True if removed, False if not found."""
-    p = Path(path)
+def _remove_file(path: Path | str) -> bool:
+    # A single unlink instead of exists() + unlink(): one syscall and no race
     try:
-        if p.exists():
-            p.unlink()
-            return True
-        return False
-    except Exception:
+        os.unlink(path)
+        return True
+    except OSError:
         return False
 
 
@@ -133,6 +202,11 @@ async def cleanup_old_cache_files(
     
     Returns the number of files deleted.
     """
+    # The directory scan and unlinks are blocking, so run them in a worker thread
+    return await asyncio.to_thread(_cleanup_old_cache_files, cache_dir, max_age_seconds)
+
+
+def _cleanup_old_cache_files(cache_dir: Optional[Path | str], max_age_seconds: int) -> int:
     cache_path = ensure_cache_dir(cache_dir)
     current_time = time.time()
     deleted_count = 0
@@ -146,54 +220,86 @@ async def cleanup_old_cache_files(
             if file_age > max_age_seconds:
                 try:
                     file_path.unlink()
-                    logger.info(f"Cleaned up old cache file: {file_path.name} (age: {file_age:.0f}s)")
+                    logger.info("Cleaned up old cache file: %s (age: %.0fs)", file_path.name, file_age)
                     deleted_count += 1
                 except Exception as e:
-                    logger.warning(f"Failed to delete old cache file {file_path.name}: {e}")
-    except Exception as e:
-        logger.exception(f"Error during cache cleanup: {e}")
+                    logger.warning("Failed to delete old cache file %s: %s", file_path.name, e)
+    except Exception:
+        logger.exception("Error during cache cleanup")
 
     return deleted_count
 
 
-async def upload_file_via_interaction(interaction: discord.Interaction, file_path: Path | str,
-                                       filename: Optional[str] = None, *, view: Optional[discord.ui.View] = None,
-                                       embed: Optional[discord.Embed] = None, use_channel: bool = False) -> bool:
+async def next_cache_expiry(
+    cache_dir: Optional[Path | str] = None,
+    max_age_seconds: int = 3600
+) -> Optional[float]:
     """
-    Send a file as part of an interaction followup or channel message.
+    Return the timestamp at which the oldest cache file becomes older than max_age_seconds.
 
-    This sends the file directly as an attachment, which Discord will host on their CDN temporarily.
-    The file path will be cleaned up by the caller.
+    Returns None if the cache directory has no files.
+    """
+    return await asyncio.to_thread(_next_cache_expiry, cache_dir, max_age_seconds)
 
-    Returns True if sent successfully, False otherwise.
+
+def _next_cache_expiry(cache_dir: Optional[Path | str], max_age_seconds: int) -> Optional[float]:
+    cache_path = ensure_cache_dir(cache_dir)
+    oldest_mtime: Optional[float] = None
+
+    try:
+        for file_path in cache_path.glob("*"):
+            if not file_path.is_file():
+                continue
+            mtime = file_path.stat().st_mtime
+            if oldest_mtime is None or mtime < oldest_mtime:
+                oldest_mtime = mtime
+    except Exception:
+        logger.exception("Error while scanning cache directory")
+
+    if oldest_mtime is None:
+        return None
+    return oldest_mtime + max_age_seconds
+
+
+def _make_discord_file(source: Path | str | io.BufferedIOBase, filename: Optional[str] = None) -> discord.File:
+    """Wrap a path on disk or an in-memory buffer in a discord.File."""
+    if isinstance(source, (str, Path)):
+        file_path = Path(source)
+        if not file_path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        # Use the provided filename or the actual file name
+        return discord.File(fp=str(file_path), filename=filename or file_path.name)
+
+    if not filename:
+        raise ValueError("filename is required when uploading from a buffer")
+    return discord.File(fp=source, filename=filename)
+
+
+async def attach_file_to_message(message: discord.Message | discord.WebhookMessage,
+                                 source: Path | str | io.BufferedIOBase, filename: Optional[str] = None,
+                                 *, embed: Optional[discord.Embed] = None) -> Optional[str]:
     """
-    file_path = Path(file_path)
-    if not file_path.exists():
-        raise FileNotFoundError(f"File not found: {file_path}")
+    Edit an already-sent message to add a file attachment (and optionally replace its embed).
+
+    This uploads the file directly as an attachment, which Discord will host on their CDN temporarily.
+    `source` is either a path on disk (cleaned up by the caller) or an in-memory buffer,
+    in which case `filename` is required.
 
-    # Use the provided filename or the actual file name
-    discord_file = discord.File(fp=str(file_path), filename=filename or file_path.name)
+    Returns the attachment's CDN URL, taken straight from the edited message
+    (no extra fetch), or None if the edit failed.
+    """
+    discord_file = _make_discord_file(source, filename)
 
-    # Build send kwargs
-    send_kwargs: dict = {"file": discord_file}
+    edit_kwargs: dict = {"attachments": [discord_file]}
     if embed is not None:
-        send_kwargs["embed"] = embed
-    if view is not None:
-        send_kwargs["view"] = view
+        edit_kwargs["embed"] = embed
 
     try:
-        # If use_channel is True, send to the interaction channel (fallback), otherwise send as followup.
-        if use_channel:
-            channel = getattr(interaction, 'channel', None)
-            if channel is None:
-                logger.error("No channel available to send the file")
-                return False
-            await channel.send(**send_kwargs)
-        else:
-            await interaction.followup.send(**send_kwargs)
-        
-        logger.info(f"Sent file as attachment: {file_path.name}")
-        return True
-    except Exception as e:
-        logger.exception(f"Failed to send file: {e}")
-        return False
+        edited = await message.edit(**edit_kwargs)
+    except Exception:
+        logger.exception("Failed to attach file")
+        return None
+
+    logger.info("Attached file to message: %s", discord_file.filename)
+    attachments = getattr(edited, "attachments", None) or []
+    return attachments[0].url if attachments else None
@@ -1,13 +1,32 @@
 import os
-from dotenv import load_dotenv
+import types
+from pathlib import Path
+from typing import Final, Optional
+
+# Every variable this module reads. If the environment already sets all of them (e.g. in a
+# container) or there is no .env file, python-dotenv isn't imported at all
+ENV_SETTINGS = ('DISCORD_TOKEN', 'BOT_PREFIX', 'BOT_STATUS', 'OWNER_ID', 'HOTLINK_COVER_IMAGES', 'DEBUG')
+
+# Point at the project's .env directly so find_dotenv() doesn't walk the directory tree;
+# variables already set in the environment take precedence
+ENV_FILE = Path(__file__).resolve().parent.parent / '.env'
+if ENV_FILE.is_file() and not all(name in os.environ for name in ENV_SETTINGS):
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=ENV_FILE, override=False)
+
+
+def _get_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean environment variable (1/true/yes/on, case-insensitive)."""
+    return os.getenv(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
 
-load_dotenv()
 
 # Bot Configuration
-DISCORD_TOKEN = os.getenv('DISCORD_TOKEN', '')
-BOT_PREFIX = os.getenv('BOT_PREFIX', '/')
-BOT_STATUS = os.getenv('BOT_STATUS', 'Online')
-OWNER_ID = os.getenv('OWNER_ID')
+DISCORD_TOKEN: Final = os.getenv('DISCORD_TOKEN', '')
+BOT_PREFIX: Final = os.getenv('BOT_PREFIX', '/')
+BOT_STATUS: Final = os.getenv('BOT_STATUS', 'Online')
+_owner_id = os.getenv('OWNER_ID')
+OWNER_ID: Final[Optional[int]] = int(_owner_id) if _owner_id else None
 
 # Server Region
 class ServerRegion:
@@ -16,12 +35,16 @@ class ServerRegion:
     AMERICA = 'os_usa'
     CHT = 'os_cht'
 
-REGION_NAMES = {
+REGION_NAMES = types.MappingProxyType({
     ServerRegion.ASIA: 'Asia',
     ServerRegion.EUROPE: 'Europe',
     ServerRegion.AMERICA: 'America',
     ServerRegion.CHT: 'TW/HK/MO',
-}
+})
+VALID_SERVERS = frozenset(REGION_NAMES)
+
+# Use upstream cover image URLs directly in embeds instead of re-uploading them to Discord
+HOTLINK_COVER_IMAGES: Final = _get_bool('HOTLINK_COVER_IMAGES')
 
 # Development
-DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+DEBUG: Final = _get_bool('DEBUG')